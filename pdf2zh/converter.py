@@ -1,7 +1,12 @@
 import concurrent.futures
+import functools
+import io
+import itertools
 import logging
 import re
+import struct
 import unicodedata
+from dataclasses import dataclass
 from enum import Enum
 from string import Template
 from typing import Dict
@@ -9,7 +14,7 @@ from typing import Dict
 import numpy as np
 from pdfminer.converter import PDFConverter
 from pdfminer.layout import LTChar, LTFigure, LTLine, LTPage
-from pdfminer.pdffont import PDFCIDFont, PDFUnicodeNotDefined
+from pdfminer.pdffont import PDFCIDFont, PDFFont, PDFUnicodeNotDefined
 from pdfminer.pdfinterp import PDFGraphicState, PDFResourceManager
 from pdfminer.utils import apply_matrix_pt, mult_matrix
 from pymupdf import Font
@@ -45,6 +50,43 @@ from pdf2zh.translator import (
 
 log = logging.getLogger(__name__)
 
+TRANSLATORS: dict[str, type[BaseTranslator]] = {
+    translator.name: translator
+    for translator in [
+        GoogleTranslator,
+        BingTranslator,
+        DeepLTranslator,
+        DeepLXTranslator,
+        OllamaTranslator,
+        XinferenceTranslator,
+        AzureOpenAITranslator,
+        OpenAITranslator,
+        ZhipuTranslator,
+        ModelScopeTranslator,
+        SiliconTranslator,
+        GeminiTranslator,
+        AzureTranslator,
+        TencentTranslator,
+        DifyTranslator,
+        AnythingLLMTranslator,
+        ArgosTranslator,
+        GrokTranslator,
+        GroqTranslator,
+        DeepseekTranslator,
+        MiniMaxTranslator,
+        OpenAIlikedTranslator,
+        QwenMtTranslator,
+        X302AITranslator,
+    ]
+}
+
+SKIP_TRANSLATE_RE = re.compile(r"^\s*(\{v\d+\})?\s*$")  # 空白和纯公式段落不翻译
+# 译文中的 {vn} 公式标记
+FORMULA_MARK_RE = re.compile(r"\{\s*v([\d\s]+)\}", re.IGNORECASE)
+LATEX_FONT_RE = re.compile(
+    r"(CM[^R]|MS.M|XY|MT|BL|RM|EU|LA|RS|LINE|LCIRCLE|TeX-|rsfs|txsy|wasy|stmary|.*Mono|.*Code|.*Ital|.*Sym|.*Math)"
+)
+
 
 class PDFConverterEx(PDFConverter):
     def __init__(
@@ -116,16 +158,16 @@ class PDFConverterEx(PDFConverter):
         return item.adv
 
 
+@dataclass(slots=True)
 class Paragraph:
-    def __init__(self, y, x, x0, x1, y0, y1, size, brk):
-        self.y: float = y  # 初始纵坐标
-        self.x: float = x  # 初始横坐标
-        self.x0: float = x0  # 左边界
-        self.x1: float = x1  # 右边界
-        self.y0: float = y0  # 上边界
-        self.y1: float = y1  # 下边界
-        self.size: float = size  # 字体大小
-        self.brk: bool = brk  # 换行标记
+    y: float  # 初始纵坐标
+    x: float  # 初始横坐标
+    x0: float  # 左边界
+    x1: float  # 右边界
+    y0: float  # 上边界
+    y1: float  # 下边界
+    size: float  # 字体大小
+    brk: bool  # 换行标记
 
 
 # fmt: off
@@ -149,28 +191,93 @@ class TranslateConverter(PDFConverterEx):
         super().__init__(rsrcmgr)
         self.vfont = vfont
         self.vchar = vchar
+        self.vfont_re = re.compile(vfont) if vfont else None
+        self.vchar_re = re.compile(vchar) if vchar else None
+        self.vflag_char: dict[tuple[str, str], bool] = {}  # (截断字体名, 字符) -> 是否为公式字符
         self.thread = thread
         self.layout = layout
         self.noto_name = noto_name
         self.noto = noto
+        self.noto_glyph = functools.lru_cache(maxsize=8192)(noto.has_glyph) if noto else None  # 字符编码 -> 字形编码
+        self.noto_width: dict[str, float] = {}                 # 字符 -> noto 单位字宽
+        self.font_width: dict[tuple[PDFFont, str], float] = {}  # (字体, 字符) -> 单位字宽
+        self.tiro_char: dict[tuple[PDFFont, str], bool] = {}   # (tiro 字体, 字符) -> 能否用 tiro 排版
         self.translator: BaseTranslator = None
+        self.executor: concurrent.futures.ThreadPoolExecutor = None
         # e.g. "ollama:gemma2:9b" -> ["ollama", "gemma2:9b"]
         param = service.split(":", 1)
         service_name = param[0]
         service_model = param[1] if len(param) > 1 else None
         if not envs:
             envs = {}
-        for translator in [GoogleTranslator, BingTranslator, DeepLTranslator, DeepLXTranslator, OllamaTranslator, XinferenceTranslator, AzureOpenAITranslator,
-                           OpenAITranslator, ZhipuTranslator, ModelScopeTranslator, SiliconTranslator, GeminiTranslator, AzureTranslator, TencentTranslator, DifyTranslator, AnythingLLMTranslator, ArgosTranslator, GrokTranslator, GroqTranslator, DeepseekTranslator, MiniMaxTranslator, OpenAIlikedTranslator, QwenMtTranslator, X302AITranslator]:
-            if service_name == translator.name:
-                self.translator = translator(lang_in, lang_out, service_model, envs=envs, prompt=prompt, ignore_cache=ignore_cache)
-        if not self.translator:
+        translator = TRANSLATORS.get(service_name)
+        if translator is None:
             raise ValueError("Unsupported translation service")
+        self.translator = translator(lang_in, lang_out, service_model, envs=envs, prompt=prompt, ignore_cache=ignore_cache)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        super().close()
+
+    def is_tiro(self, ch: str) -> bool:  # 字符能否用默认拉丁字体排版
+        tiro = self.fontmap.get("tiro")
+        ok = self.tiro_char.get((tiro, ch))
+        if ok is None:
+            try:
+                ok = tiro.to_unichr(ord(ch)) == ch
+            except Exception:
+                ok = False
+            self.tiro_char[(tiro, ch)] = ok
+        return ok
+
+    @staticmethod
+    def font_name(font: str | bytes) -> str:
+        if isinstance(font, bytes):     # 不一定能 decode，直接转 str
+            try:
+                font = font.decode('utf-8')  # 尝试使用 UTF-8 解码
+            except UnicodeDecodeError:
+                font = ""
+        return font.split("+")[-1]      # 字体名截断
+
+    def vflag(self, font: str, char: str):    # 匹配公式（和角标）字体，font 为截断后的字体名
+        if char.startswith("(cid:"):
+            return True
+        # 基于字体名规则的判定
+        if self.vfont_re:
+            if self.vfont_re.match(font):
+                return True
+        else:
+            if LATEX_FONT_RE.match(font):   # latex 字体
+                return True
+        # 基于字符集规则的判定
+        if self.vchar_re:
+            if self.vchar_re.match(char):
+                return True
+        else:
+            if (
+                char
+                and char != " "                                     # 非空格
+                and (
+                    unicodedata.category(char[0])
+                    in ["Lm", "Mn", "Sk", "Sm", "Zl", "Zp", "Zs"]   # 文字修饰符、数学符号、分隔符号
+                    or ord(char[0]) in range(0x370, 0x400)          # 希腊字母
+                )
+            ):
+                return True
+        return False
 
     def receive_layout(self, ltpage: LTPage):
+        _debug = log.isEnabledFor(logging.DEBUG)  # 调试标记，避免逐字符查询日志级别
         # 段落
         sstk: list[str] = []            # 段落文字栈
         pstk: list[Paragraph] = []      # 段落属性栈
+        pbox: list[tuple] = []          # 段落边界缓冲 (段落序号, x0, x1, y0, y1)
+        sbuf: list[list[str]] = []      # 段落文字片段栈，解析结束后拼接为 sstk
+        cur_s: list[str] = None         # 当前段落文字片段，不含空串
+        cur_nb: int = 0                 # 当前段落去除首尾空白后的长度，仅保证 0、1、>1 三种情况准确
+        cur_p: Paragraph = None         # 当前段落属性
         vbkt: int = 0                   # 段落公式括号计数
         # 公式组
         vstk: list[LTChar] = []         # 公式符号组
@@ -185,73 +292,51 @@ class TranslateConverter(PDFConverterEx):
         lstk: list[LTLine] = []         # 全局线条栈
         xt: LTChar = None               # 上一个字符
         xt_cls: int = -1                # 上一个字符所属段落，保证无论第一个字符属于哪个类别都可以触发新段落
+        fname_raw: str | bytes = None   # 上一个字符的原始字体名
+        fname: str = ""                 # 上一个字符的截断字体名
         vmax: float = ltpage.width / 4  # 行内公式最大宽度
         ops: str = ""                   # 渲染结果
 
-        def vflag(font: str, char: str):    # 匹配公式（和角标）字体
-            if isinstance(font, bytes):     # 不一定能 decode，直接转 str
-                try:
-                    font = font.decode('utf-8')  # 尝试使用 UTF-8 解码
-                except UnicodeDecodeError:
-                    font = ""
-            font = font.split("+")[-1]      # 字体名截断
-            if re.match(r"\(cid:", char):
-                return True
-            # 基于字体名规则的判定
-            if self.vfont:
-                if re.match(self.vfont, font):
-                    return True
-            else:
-                if re.match(                                            # latex 字体
-                    r"(CM[^R]|MS.M|XY|MT|BL|RM|EU|LA|RS|LINE|LCIRCLE|TeX-|rsfs|txsy|wasy|stmary|.*Mono|.*Code|.*Ital|.*Sym|.*Math)",
-                    font,
-                ):
-                    return True
-            # 基于字符集规则的判定
-            if self.vchar:
-                if re.match(self.vchar, char):
-                    return True
-            else:
-                if (
-                    char
-                    and char != " "                                     # 非空格
-                    and (
-                        unicodedata.category(char[0])
-                        in ["Lm", "Mn", "Sk", "Sm", "Zl", "Zp", "Zs"]   # 文字修饰符、数学符号、分隔符号
-                        or ord(char[0]) in range(0x370, 0x400)          # 希腊字母
-                    )
-                ):
-                    return True
-            return False
-
         ############################################################
         # A. 原文档解析
+        layout = self.layout[ltpage.pageid]
+        # ltpage.height 可能是 fig 里面的高度，这里统一用 layout.shape
+        h, w = layout.shape
+        # 批量读取所有字符在 layout 中的类别
+        chars = [child for child in ltpage if isinstance(child, LTChar)]
+        xs = np.clip(np.fromiter((int(ch.x0) for ch in chars), dtype=np.int32, count=len(chars)), 0, w - 1)
+        ys = np.clip(np.fromiter((int(ch.y0) for ch in chars), dtype=np.int32, count=len(chars)), 0, h - 1)
+        # 预先计算与上下文无关的逐字符属性 (文字, 类别, 是否属于保留区域、公式字体或垂直字体)
+        cinfo: list[tuple[str, int, bool]] = []
+        for ch, cls in zip(chars, layout[ys, xs].tolist() if chars else []):
+            text = ch.get_text()
+            if text == "•":                     # 锚定文档中 bullet 的位置
+                cls = 0
+            if ch.fontname is not fname_raw:    # 字体名只在字体切换时处理
+                fname_raw, fname = ch.fontname, self.font_name(ch.fontname)
+            vf = self.vflag_char.get((fname, text))   # (字体, 字符) 在同一文档中大量重复
+            if vf is None:
+                vf = self.vflag_char[(fname, text)] = self.vflag(fname, text)
+            cinfo.append((text, cls, (
+                cls == 0                                    # 1. 类别为保留区域
+                or vf                                       # 3. 公式字体
+                or (ch.matrix[0] == 0 and ch.matrix[3] == 0)  # 4. 垂直字体
+            )))
+        cinfo_iter = iter(cinfo)
         for child in ltpage:
             if isinstance(child, LTChar):
-                cur_v = False
-                layout = self.layout[ltpage.pageid]
-                # ltpage.height 可能是 fig 里面的高度，这里统一用 layout.shape
-                h, w = layout.shape
-                # 读取当前字符在 layout 中的类别
-                cx, cy = np.clip(int(child.x0), 0, w - 1), np.clip(int(child.y0), 0, h - 1)
-                cls = layout[cy, cx]
-                # 锚定文档中 bullet 的位置
-                if child.get_text() == "•":
-                    cls = 0
-                # 判定当前字符是否属于公式
-                if (                                                                                        # 判定当前字符是否属于公式
-                    cls == 0                                                                                # 1. 类别为保留区域
-                    or (cls == xt_cls and len(sstk[-1].strip()) > 1 and child.size < pstk[-1].size * 0.79)  # 2. 角标字体，有 0.76 的角标和 0.799 的大写，这里用 0.79 取中，同时考虑首字母放大的情况
-                    or vflag(child.fontname, child.get_text())                                              # 3. 公式字体
-                    or (child.matrix[0] == 0 and child.matrix[3] == 0)                                      # 4. 垂直字体
+                text, cls, cur_v = next(cinfo_iter)
+                # 判定当前字符是否属于公式，1. 3. 4. 已预先计算
+                if (
+                    not cur_v and cls == xt_cls and cur_nb > 1 and child.size < cur_p.size * 0.79  # 2. 角标字体，有 0.76 的角标和 0.799 的大写，这里用 0.79 取中，同时考虑首字母放大的情况
                 ):
                     cur_v = True
                 # 判定括号组是否属于公式
                 if not cur_v:
-                    if vstk and child.get_text() == "(":
+                    if vstk and text == "(":
                         cur_v = True
                         vbkt += 1
-                    if vbkt and child.get_text() == ")":
+                    if vbkt and text == ")":
                         cur_v = True
                         vbkt -= 1
                 if (                                                        # 判定当前公式是否结束
@@ -259,9 +344,9 @@ class TranslateConverter(PDFConverterEx):
                     or cls != xt_cls                                        # 2. 当前字符与前一个字符不属于同一段落
                     # or (abs(child.x0 - xt.x0) > vmax and cls != 0)        # 3. 段落内换行，可能是一长串斜体的段落，也可能是段内分式换行，这里设个阈值进行区分
                     # 禁止纯公式（代码）段落换行，直到文字开始再重开文字段落，保证只存在两种情况
-                    # A. 纯公式（代码）段落（锚定绝对位置）sstk[-1]=="" -> sstk[-1]=="{v*}"
-                    # B. 文字开头段落（排版相对位置）sstk[-1]!=""
-                    or (sstk[-1] != "" and abs(child.x0 - xt.x0) > vmax)    # 因为 cls==xt_cls==0 一定有 sstk[-1]==""，所以这里不需要再判定 cls!=0
+                    # A. 纯公式（代码）段落（锚定绝对位置）cur_s==[] -> cur_s==["{v*}"]
+                    # B. 文字开头段落（排版相对位置）cur_s!=[]
+                    or (cur_s and abs(child.x0 - xt.x0) > vmax)             # 因为 cls==xt_cls==0 一定有 cur_s==[]，所以这里不需要再判定 cls!=0
                 ):
                     if vstk:
                         if (                                                # 根据公式右侧的文字修正公式的纵向偏移
@@ -270,9 +355,10 @@ class TranslateConverter(PDFConverterEx):
                             and child.x0 > max([vch.x0 for vch in vstk])    # 3. 当前字符在公式右侧
                         ):
                             vfix = vstk[0].y0 - child.y0
-                        if sstk[-1] == "":
-                            xt_cls = -1 # 禁止纯公式段落（sstk[-1]=="{v*}"）的后续连接，但是要考虑新字符和后续字符的连接，所以这里修改的是上个字符的类别
-                        sstk[-1] += f"{{v{len(var)}}}"
+                        if not cur_s:
+                            xt_cls = -1 # 禁止纯公式段落（cur_s==["{v*}"]）的后续连接，但是要考虑新字符和后续字符的连接，所以这里修改的是上个字符的类别
+                        cur_s.append(f"{{v{len(var)}}}")
+                        cur_nb += 2
                         var.append(vstk)
                         varl.append(vlstk)
                         varf.append(vfix)
@@ -283,21 +369,25 @@ class TranslateConverter(PDFConverterEx):
                 if not vstk:
                     if cls == xt_cls:               # 当前字符与前一个字符属于同一段落
                         if child.x0 > xt.x1 + 1:    # 添加行内空格
-                            sstk[-1] += " "
+                            cur_s.append(" ")
                         elif child.x1 < xt.x0:      # 添加换行空格并标记原文段落存在换行
-                            sstk[-1] += " "
-                            pstk[-1].brk = True
+                            cur_s.append(" ")
+                            cur_p.brk = True
                     else:                           # 根据当前字符构建一个新的段落
-                        sstk.append("")
-                        pstk.append(Paragraph(child.y0, child.x0, child.x0, child.x0, child.y0, child.y1, child.size, False))
+                        cur_s, cur_nb = [], 0
+                        cur_p = Paragraph(child.y0, child.x0, child.x0, child.x0, child.y0, child.y1, child.size, False)
+                        sbuf.append(cur_s)
+                        pstk.append(cur_p)
                 if not cur_v:                                               # 文字入栈
                     if (                                                    # 根据当前字符修正段落属性
-                        child.size > pstk[-1].size                          # 1. 当前字符比段落字体大
-                        or len(sstk[-1].strip()) == 1                       # 2. 当前字符为段落第二个文字（考虑首字母放大的情况）
-                    ) and child.get_text() != " ":                          # 3. 当前字符不是空格
-                        pstk[-1].y -= child.size - pstk[-1].size            # 修正段落初始纵坐标，假设两个不同大小字符的上边界对齐
-                        pstk[-1].size = child.size
-                    sstk[-1] += child.get_text()
+                        child.size > cur_p.size                             # 1. 当前字符比段落字体大
+                        or cur_nb == 1                                      # 2. 当前字符为段落第二个文字（考虑首字母放大的情况）
+                    ) and text != " ":                                      # 3. 当前字符不是空格
+                        cur_p.y -= child.size - cur_p.size                  # 修正段落初始纵坐标，假设两个不同大小字符的上边界对齐
+                        cur_p.size = child.size
+                    if text:
+                        cur_s.append(text)
+                        cur_nb += len(text.strip())
                 else:                                                       # 公式入栈
                     if (                                                    # 根据公式左侧的文字修正公式的纵向偏移
                         not vstk                                            # 1. 当前字符是公式的第一个字符
@@ -306,20 +396,14 @@ class TranslateConverter(PDFConverterEx):
                     ):
                         vfix = child.y0 - xt.y0
                     vstk.append(child)
-                # 更新段落边界，因为段落内换行之后可能是公式开头，所以要在外边处理
-                pstk[-1].x0 = min(pstk[-1].x0, child.x0)
-                pstk[-1].x1 = max(pstk[-1].x1, child.x1)
-                pstk[-1].y0 = min(pstk[-1].y0, child.y0)
-                pstk[-1].y1 = max(pstk[-1].y1, child.y1)
+                # 记录段落边界，因为段落内换行之后可能是公式开头，所以要在外边处理
+                pbox.append((len(pstk) - 1, child.x0, child.x1, child.y0, child.y1))
                 # 更新上一个字符
                 xt = child
                 xt_cls = cls
             elif isinstance(child, LTFigure):   # 图表
                 pass
             elif isinstance(child, LTLine):     # 线条
-                layout = self.layout[ltpage.pageid]
-                # ltpage.height 可能是 fig 里面的高度，这里统一用 layout.shape
-                h, w = layout.shape
                 # 读取当前线条在 layout 中的类别
                 cx, cy = np.clip(int(child.x0), 0, w - 1), np.clip(int(child.y0), 0, h - 1)
                 cls = layout[cy, cx]
@@ -331,10 +415,21 @@ class TranslateConverter(PDFConverterEx):
                 pass
         # 处理结尾
         if vstk:    # 公式出栈
-            sstk[-1] += f"{{v{len(var)}}}"
+            cur_s.append(f"{{v{len(var)}}}")
             var.append(vstk)
             varl.append(vlstk)
             varf.append(vfix)
+        sstk = ["".join(pieces) for pieces in sbuf]
+        if pbox:    # 按段落批量更新边界，段落序号单调递增，无需排序
+            box = np.asarray(pbox)
+            pidx = box[:, 0].astype(np.int64)
+            starts = np.flatnonzero(np.r_[True, pidx[1:] != pidx[:-1]])
+            lo = np.minimum.reduceat(box[:, [1, 3]], starts).tolist()
+            hi = np.maximum.reduceat(box[:, [2, 4]], starts).tolist()
+            for i, (bx0, by0), (bx1, by1) in zip(pidx[starts].tolist(), lo, hi):
+                p = pstk[i]
+                p.x0, p.x1 = min(p.x0, bx0), max(p.x1, bx1)
+                p.y0, p.y1 = min(p.y0, by0), max(p.y1, by1)
         log.debug("\n==========[VSTACK]==========\n")
         for id, v in enumerate(var):  # 计算公式宽度
             l = max([vch.x1 for vch in v]) - v[0].x0
@@ -346,32 +441,32 @@ class TranslateConverter(PDFConverterEx):
         log.debug("\n==========[SSTACK]==========\n")
 
         @retry(wait=wait_fixed(1))
-        def worker(s: str):  # 多线程翻译
-            if not s.strip() or re.match(r"^\{v\d+\}$", s):  # 空白和公式不翻译
-                return s
+        def worker(batch: list[str]):  # 多线程翻译
             try:
-                new = self.translator.translate(s)
-                return new
+                return self.translator.translate_batch(batch)
             except BaseException as e:
-                if log.isEnabledFor(logging.DEBUG):
+                if _debug:
                     log.exception(e)
                 else:
                     log.exception(e, exc_info=False)
                 raise e
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self.thread
-        ) as executor:
-            news = list(executor.map(worker, sstk))
+        uniq = [s for s in {s: None for s in sstk} if not SKIP_TRANSLATE_RE.match(s)]  # 相同段落只翻译一次
+        n = self.translator.batch_size
+        if self.executor is None:  # 线程池在整个文档中复用
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.thread)
+        results = self.executor.map(worker, [uniq[i:i + n] for i in range(0, len(uniq), n)])
+        cache = dict(zip(uniq, itertools.chain.from_iterable(results), strict=True))  # 译文数量不符时报错而不是静默截断
+        news = [cache.get(s, s) for s in sstk]
 
         ############################################################
         # C. 新文档排版
         def raw_string(fcur: str, cstk: str):  # 编码字符串
             if fcur == self.noto_name:
-                return "".join(["%04x" % self.noto.has_glyph(ord(c)) for c in cstk])
+                return struct.pack(f">{len(cstk)}H", *map(self.noto_glyph, map(ord, cstk))).hex()
             elif isinstance(self.fontmap[fcur], PDFCIDFont):  # 判断编码长度
-                return "".join(["%04x" % ord(c) for c in cstk])
+                return struct.pack(f">{len(cstk)}H", *map(ord, cstk)).hex()  # CID 可能落在代理区，不能用 utf-16 编码
             else:
-                return "".join(["%02x" % ord(c) for c in cstk])
+                return cstk.encode("latin-1").hex()
 
         # 根据目标语言获取默认行距
         LANG_LINEHEIGHT_MAP = {
@@ -380,13 +475,14 @@ class TranslateConverter(PDFConverterEx):
         }
         default_line_height = LANG_LINEHEIGHT_MAP.get(self.translator.lang_out.lower(), 1.1) # 小语种默认1.1
         _x, _y = 0, 0
-        ops_list = []
+        ops_buf = io.StringIO()
+        ops_buf.write("BT ")
 
-        def gen_op_txt(font, size, x, y, rtxt):
-            return f"/{font} {size:f} Tf 1 0 0 1 {x:f} {y:f} Tm [<{rtxt}>] TJ "
+        def write_op_txt(font, size, x, y, rtxt):
+            ops_buf.write(f"/{font} {size:f} Tf 1 0 0 1 {x:f} {y:f} Tm [<{rtxt}>] TJ ")
 
-        def gen_op_line(x, y, xlen, ylen, linewidth):
-            return f"ET q 1 0 0 1 {x:f} {y:f} cm [] 0 d 0 J {linewidth:f} w 0 0 m {xlen:f} {ylen:f} l S Q BT "
+        def write_op_line(x, y, xlen, ylen, linewidth):
+            ops_buf.write(f"ET q 1 0 0 1 {x:f} {y:f} cm [] 0 d 0 J {linewidth:f} w 0 0 m {xlen:f} {ylen:f} l S Q BT ")
 
         for id, new in enumerate(news):
             x: float = pstk[id].x                       # 段落初始横坐标
@@ -401,18 +497,22 @@ class TranslateConverter(PDFConverterEx):
             lidx = 0                                    # 记录换行次数
             tx = x
             fcur_ = fcur
-            ptr = 0
             log.debug(f"< {y} {x} {x0} {x1} {size} {brk} > {sstk[id]} | {new}")
 
-            ops_vals: list[dict] = []
+            ops_vals: list[tuple] = []                  # (类型, x, dy, lidx, ...)，文字后接 font, size, rtxt，线条后接 xlen, ylen, linewidth
+
+            tokens: list = []                           # 预先切分出 {vn} 公式标记和单个文字
+            last = 0
+            for m in FORMULA_MARK_RE.finditer(new):
+                tokens.extend(new[last:m.start()])
+                tokens.append(m)
+                last = m.end()
+            tokens.extend(new[last:])
 
-            while ptr < len(new):
-                vy_regex = re.match(
-                    r"\{\s*v([\d\s]+)\}", new[ptr:], re.IGNORECASE
-                )  # 匹配 {vn} 公式标记
+            for tok in tokens:
+                vy_regex = None if isinstance(tok, str) else tok  # 匹配 {vn} 公式标记
                 mod = 0  # 文字修饰符
                 if vy_regex:  # 加载公式
-                    ptr += len(vy_regex.group(0))
                     try:
                         vid = int(vy_regex.group(1).replace(" ", ""))
                         adv = vlen[vid]
@@ -421,35 +521,28 @@ class TranslateConverter(PDFConverterEx):
                     if var[vid][-1].get_text() and unicodedata.category(var[vid][-1].get_text()[0]) in ["Lm", "Mn", "Sk"]:  # 文字修饰符
                         mod = var[vid][-1].width
                 else:  # 加载文字
-                    ch = new[ptr]
-                    fcur_ = None
-                    try:
-                        if fcur_ is None and self.fontmap["tiro"].to_unichr(ord(ch)) == ch:
-                            fcur_ = "tiro"  # 默认拉丁字体
-                    except Exception:
-                        pass
-                    if fcur_ is None:
+                    ch = tok
+                    if self.is_tiro(ch):
+                        fcur_ = "tiro"  # 默认拉丁字体
+                    else:
                         fcur_ = self.noto_name  # 默认非拉丁字体
                     if fcur_ == self.noto_name: # FIXME: change to CONST
-                        adv = self.noto.char_lengths(ch, size)[0]
+                        cw = self.noto_width.get(ch)
+                        if cw is None:
+                            cw = self.noto_width[ch] = self.noto.char_lengths(ch, 1)[0]
                     else:
-                        adv = self.fontmap[fcur_].char_width(ord(ch)) * size
-                    ptr += 1
+                        font = self.fontmap[fcur_]
+                        cw = self.font_width.get((font, ch))
+                        if cw is None:
+                            cw = self.font_width[(font, ch)] = font.char_width(ord(ch))
+                    adv = cw * size
                 if (                                # 输出文字缓冲区
                     fcur_ != fcur                   # 1. 字体更新
                     or vy_regex                     # 2. 插入公式
                     or x + adv > x1 + 0.1 * size    # 3. 到达右边界（可能一整行都被符号化，这里需要考虑浮点误差）
                 ):
                     if cstk:
-                        ops_vals.append({
-                            "type": OpType.TEXT,
-                            "font": fcur,
-                            "size": size,
-                            "x": tx,
-                            "dy": 0,
-                            "rtxt": raw_string(fcur, cstk),
-                            "lidx": lidx
-                        })
+                        ops_vals.append((OpType.TEXT, tx, 0, lidx, fcur, size, raw_string(fcur, cstk)))
                         cstk = ""
                 if brk and x + adv > x1 + 0.1 * size:  # 到达右边界且原文段落存在换行
                     x = x0
@@ -460,29 +553,13 @@ class TranslateConverter(PDFConverterEx):
                         fix = varf[vid]
                     for vch in var[vid]:  # 排版公式字符
                         vc = chr(vch.cid)
-                        ops_vals.append({
-                            "type": OpType.TEXT,
-                            "font": self.fontid[vch.font],
-                            "size": vch.size,
-                            "x": x + vch.x0 - var[vid][0].x0,
-                            "dy": fix + vch.y0 - var[vid][0].y0,
-                            "rtxt": raw_string(self.fontid[vch.font], vc),
-                            "lidx": lidx
-                        })
-                        if log.isEnabledFor(logging.DEBUG):
+                        ops_vals.append((OpType.TEXT, x + vch.x0 - var[vid][0].x0, fix + vch.y0 - var[vid][0].y0, lidx, self.fontid[vch.font], vch.size, raw_string(self.fontid[vch.font], vc)))
+                        if _debug:
                             lstk.append(LTLine(0.1, (_x, _y), (x + vch.x0 - var[vid][0].x0, fix + y + vch.y0 - var[vid][0].y0)))
                             _x, _y = x + vch.x0 - var[vid][0].x0, fix + y + vch.y0 - var[vid][0].y0
                     for l in varl[vid]:  # 排版公式线条
                         if l.linewidth < 5:  # hack 有的文档会用粗线条当图片背景
-                            ops_vals.append({
-                                "type": OpType.LINE,
-                                "x": l.pts[0][0] + x - var[vid][0].x0,
-                                "dy": l.pts[0][1] + fix - var[vid][0].y0,
-                                "linewidth": l.linewidth,
-                                "xlen": l.pts[1][0] - l.pts[0][0],
-                                "ylen": l.pts[1][1] - l.pts[0][1],
-                                "lidx": lidx
-                            })
+                            ops_vals.append((OpType.LINE, l.pts[0][0] + x - var[vid][0].x0, l.pts[0][1] + fix - var[vid][0].y0, lidx, l.pts[1][0] - l.pts[0][0], l.pts[1][1] - l.pts[0][1], l.linewidth))
                 else:  # 插入文字缓冲区
                     if not cstk:  # 单行开头
                         tx = x
@@ -495,37 +572,31 @@ class TranslateConverter(PDFConverterEx):
                 adv -= mod # 文字修饰符
                 fcur = fcur_
                 x += adv
-                if log.isEnabledFor(logging.DEBUG):
+                if _debug:
                     lstk.append(LTLine(0.1, (_x, _y), (x, y)))
                     _x, _y = x, y
             # 处理结尾
             if cstk:
-                ops_vals.append({
-                    "type": OpType.TEXT,
-                    "font": fcur,
-                    "size": size,
-                    "x": tx,
-                    "dy": 0,
-                    "rtxt": raw_string(fcur, cstk),
-                    "lidx": lidx
-                })
+                ops_vals.append((OpType.TEXT, tx, 0, lidx, fcur, size, raw_string(fcur, cstk)))
 
             line_height = default_line_height
 
             while (lidx + 1) * size * line_height > height and line_height >= 1:
                 line_height -= 0.05
 
-            for vals in ops_vals:
-                if vals["type"] == OpType.TEXT:
-                    ops_list.append(gen_op_txt(vals["font"], vals["size"], vals["x"], vals["dy"] + y - vals["lidx"] * size * line_height, vals["rtxt"]))
-                elif vals["type"] == OpType.LINE:
-                    ops_list.append(gen_op_line(vals["x"], vals["dy"] + y - vals["lidx"] * size * line_height, vals["xlen"], vals["ylen"], vals["linewidth"]))
+            for optype, ox, dy, olidx, a, b, c in ops_vals:
+                oy = dy + y - olidx * size * line_height
+                if optype is OpType.TEXT:
+                    write_op_txt(a, b, ox, oy, c)
+                elif optype is OpType.LINE:
+                    write_op_line(ox, oy, a, b, c)
 
         for l in lstk:  # 排版全局线条
             if l.linewidth < 5:  # hack 有的文档会用粗线条当图片背景
-                ops_list.append(gen_op_line(l.pts[0][0], l.pts[0][1], l.pts[1][0] - l.pts[0][0], l.pts[1][1] - l.pts[0][1], l.linewidth))
+                write_op_line(l.pts[0][0], l.pts[0][1], l.pts[1][0] - l.pts[0][0], l.pts[1][1] - l.pts[0][1], l.linewidth)
 
-        ops = f"BT {''.join(ops_list)}ET "
+        ops_buf.write("ET ")
+        ops = ops_buf.getvalue()
         return ops
 
 
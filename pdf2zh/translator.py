@@ -41,6 +41,7 @@ class BaseTranslator:
     envs = {}
     lang_map: dict[str, str] = {}
     CustomPrompt = False
+    batch_size = 1  # 单次请求的最大段落数
 
     def __init__(self, lang_in: str, lang_out: str, model: str, ignore_cache: bool):
         lang_in = self.lang_map.get(lang_in.lower(), lang_in)
@@ -109,6 +110,35 @@ class BaseTranslator:
         """
         raise NotImplementedError
 
+    def translate_batch(
+        self, texts: list[str], ignore_cache: bool = False
+    ) -> list[str]:
+        """
+        Translate a list of texts, sending the uncached ones in one request if the service supports it.
+        :param texts: texts to translate
+        :return: translated texts, in the same order as texts
+        """
+        if self.batch_size <= 1:
+            return [self.translate(text, ignore_cache) for text in texts]
+        translations: list[str | None] = [None] * len(texts)
+        if not (self.ignore_cache or ignore_cache):
+            translations = [self.cache.get(text) for text in texts]
+        todo = [i for i, translation in enumerate(translations) if translation is None]
+        if todo:
+            results = self.do_translate_batch([texts[i] for i in todo])
+            for i, translation in zip(todo, results, strict=True):
+                self.cache.set(texts[i], translation)
+                translations[i] = translation
+        return translations
+
+    def do_translate_batch(self, texts: list[str]) -> list[str]:
+        """
+        Actual translate a list of texts, override this method together with batch_size
+        :param texts: texts to translate
+        :return: translated texts, in the same order as texts
+        """
+        return [self.do_translate(text) for text in texts]
+
     def prompt(
         self, text: str, prompt_template: Template | None = None
     ) -> list[dict[str, str]]:
@@ -242,6 +272,7 @@ class DeepLTranslator(BaseTranslator):
         "DEEPL_AUTH_KEY": None,
     }
     lang_map = {"zh": "zh-Hans"}
+    batch_size = 32
 
     def __init__(
         self, lang_in, lang_out, model, envs=None, ignore_cache=False, **kwargs
@@ -257,6 +288,12 @@ class DeepLTranslator(BaseTranslator):
         )
         return response.text
 
+    def do_translate_batch(self, texts):
+        response = self.client.translate_text(
+            texts, target_lang=self.lang_out, source_lang=self.lang_in
+        )
+        return [result.text for result in response]
+
 
 class DeepLXTranslator(BaseTranslator):
     # https://deeplx.owo.network/endpoints/free.html
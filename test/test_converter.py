@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import Mock, patch, MagicMock
+import numpy as np
 from pdfminer.layout import LTPage, LTChar, LTLine
+from pdfminer.pdffont import PDFCIDFont
 from pdfminer.pdfinterp import PDFResourceManager
 from pdf2zh.converter import PDFConverterEx, TranslateConverter
 
@@ -95,6 +97,92 @@ class TestTranslateConverter(unittest.TestCase):
         result = self.converter.receive_layout(ltpage)
         self.assertIsNotNone(result)
 
+    @staticmethod
+    def make_font(fontname, spec=None):
+        font = Mock(spec=spec)
+        font.fontname = fontname
+        font.is_vertical.return_value = False
+        font.get_descent.return_value = 0
+        font.to_unichr.side_effect = chr
+        font.char_width.return_value = 0.5
+        return font
+
+    @staticmethod
+    def make_char(font, text, x, y):
+        ch = LTChar((1, 0, 0, 1, x, y), font, 10, 1.0, 0, text, 0.5, 0, None, None)
+        ch.cid = ord(text)
+        ch.font = font
+        return ch
+
+    def test_receive_layout_translates_unique_paragraphs(self):
+        text_font = self.make_font("Helvetica")
+        math_font = self.make_font("CMMI10")
+        ltpage = LTPage(1, (0, 0, 200, 200))
+        layout = np.ones((200, 200), dtype=np.int32)
+        for cls, (y, text) in enumerate(
+            [(100, "Hello"), (80, "World"), (60, "Hello")], start=2
+        ):
+            layout[y : y + 10] = cls
+            for i, c in enumerate(text):
+                ltpage.add(self.make_char(text_font, c, 10 + 5 * i, y))
+        # whitespace-padded formula-only paragraph " {v0} "
+        layout[40:50] = 5
+        ltpage.add(self.make_char(text_font, " ", 10, 40))
+        ltpage.add(self.make_char(math_font, "x", 15, 40))
+        ltpage.add(self.make_char(text_font, " ", 20, 40))
+        self.converter.layout = {1: layout}
+        self.converter.fontmap = {"tiro": text_font, "F1": text_font, "F2": math_font}
+        self.converter.fontid = {text_font: "F1", math_font: "F2"}
+        self.converter.thread = 1
+        translator = self.converter.translator
+        translator.batch_size = 8
+        with patch.object(
+            translator,
+            "translate_batch",
+            side_effect=lambda texts: [text.upper() for text in texts],
+        ) as mock_translate_batch:
+            ops = self.converter.receive_layout(ltpage)
+        self.converter.close()
+        mock_translate_batch.assert_called_once_with(["Hello", "World"])
+        hello, world = "HELLO".encode().hex(), "WORLD".encode().hex()
+        self.assertEqual(ops.count(hello), 2)
+        first, second = ops.index(hello), ops.rindex(hello)
+        self.assertLess(first, ops.index(world))
+        self.assertLess(ops.index(world), second)
+        self.assertIn("/F2 10.000000 Tf", ops)
+
+    def test_receive_layout_cid_surrogate_glyph(self):
+        text_font = self.make_font("Helvetica")
+        cid_font = self.make_font("CMMI10", spec=PDFCIDFont)
+        ltpage = LTPage(1, (0, 0, 200, 200))
+        ch = self.make_char(cid_font, "x", 10, 100)
+        ch.cid = 0xD801  # glyph index in the UTF-16 surrogate range
+        ltpage.add(ch)
+        self.converter.layout = {1: np.full((200, 200), 2, dtype=np.int32)}
+        self.converter.fontmap = {"tiro": text_font, "F1": cid_font}
+        self.converter.fontid = {cid_font: "F1"}
+        self.converter.thread = 1
+        ops = self.converter.receive_layout(ltpage)
+        self.converter.close()
+        self.assertIn("/F1 10.000000 Tf", ops)
+        self.assertIn("[<d801>] TJ", ops)
+
+    def test_close_shuts_down_executor(self):
+        ltpage = LTPage(1, (0, 0, 500, 500))
+        mock_layout = MagicMock()
+        mock_layout.shape = (100, 100)
+        self.converter.layout = [None, mock_layout]
+        self.converter.thread = 1
+        self.converter.receive_layout(ltpage)
+        executor = self.converter.executor
+        self.assertIsNotNone(executor)
+        self.converter.receive_layout(ltpage)
+        self.assertIs(executor, self.converter.executor)
+        self.converter.close()
+        self.assertIsNone(self.converter.executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+
     def test_invalid_translation_service(self):
         with self.assertRaises(ValueError):
             TranslateConverter(
@@ -0,0 +1,52 @@
+import asyncio
+import io
+import unittest
+from asyncio import CancelledError
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from pymupdf import Document
+
+TEST_PDF = Path(__file__).parent / "file" / "translate.cli.plain.text.pdf"
+
+
+class TestTranslatePatch(unittest.TestCase):
+    def setUp(self):
+        self.data = TEST_PDF.read_bytes()
+        self.doc_zh = Document(stream=self.data)
+
+    def tearDown(self):
+        self.doc_zh.close()
+
+    def translate_patch(self, **kwargs):
+        # Import lazily: test_cli checks that pdf2zh.high_level is not preloaded
+        from pdf2zh.high_level import translate_patch
+
+        return translate_patch(io.BytesIO(self.data), doc_zh=self.doc_zh, **kwargs)
+
+    @patch("pdf2zh.high_level.TranslateConverter")
+    def test_device_closed_after_pages(self, mock_converter):
+        model = Mock()
+        model.predict.return_value = [Mock(boxes=[])]
+        self.translate_patch(model=model)
+        mock_converter.return_value.close.assert_called_once_with()
+
+    @patch("pdf2zh.high_level.TranslateConverter")
+    def test_device_closed_when_page_fails(self, mock_converter):
+        model = Mock()
+        model.predict.side_effect = RuntimeError("layout failed")
+        with self.assertRaises(RuntimeError):
+            self.translate_patch(model=model)
+        mock_converter.return_value.close.assert_called_once_with()
+
+    @patch("pdf2zh.high_level.TranslateConverter")
+    def test_device_closed_when_cancelled(self, mock_converter):
+        cancellation_event = asyncio.Event()
+        cancellation_event.set()
+        with self.assertRaises(CancelledError):
+            self.translate_patch(cancellation_event=cancellation_event)
+        mock_converter.return_value.close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,12 @@ from ollama import ResponseError as OllamaResponseError
 
 from pdf2zh import cache
 from pdf2zh.config import ConfigManager
-from pdf2zh.translator import BaseTranslator, OllamaTranslator, OpenAIlikedTranslator
+from pdf2zh.translator import (
+    BaseTranslator,
+    DeepLTranslator,
+    OllamaTranslator,
+    OpenAIlikedTranslator,
+)
 
 # Since it is necessary to test whether the functionality meets the expected requirements,
 # private functions and private methods are allowed to be called.
@@ -22,6 +27,16 @@ class AutoIncreaseTranslator(BaseTranslator):
         return str(self.n)
 
 
+class AutoIncreaseBatchTranslator(BaseTranslator):
+    name = "auto_increase_batch"
+    batch_size = 4
+    n = 0
+
+    def do_translate_batch(self, texts):
+        self.n += 1
+        return [f"{self.n}:{text}" for text in texts]
+
+
 class TestTranslator(unittest.TestCase):
     def setUp(self):
         self.test_db = cache.init_test_db()
@@ -77,6 +92,24 @@ class TestTranslator(unittest.TestCase):
         another_result = translator.translate(text)
         self.assertNotEqual(second_result, another_result)
 
+    def test_translate_batch(self):
+        translator = AutoIncreaseBatchTranslator("en", "zh", "test", False)
+        first_result = translator.translate_batch(["Hello", "World"])
+        self.assertEqual(["1:Hello", "1:World"], first_result)
+
+        # Cached texts are not sent again
+        second_result = translator.translate_batch(["World", "Again", "Hello"])
+        self.assertEqual(["1:World", "2:Again", "1:Hello"], second_result)
+
+        # A backend returning fewer translations than requested is an error
+        with mock.patch.object(translator, "do_translate_batch", return_value=[]):
+            with self.assertRaises(ValueError):
+                translator.translate_batch(["Missing"])
+
+        # Fall back to per-text translation without batch support
+        translator = AutoIncreaseTranslator("en", "zh", "test", False)
+        self.assertEqual(["1", "2"], translator.translate_batch(["Hello", "World"]))
+
     def test_base_translator_throw(self):
         translator = BaseTranslator("en", "zh", "test", False)
         with self.assertRaises(NotImplementedError):
@@ -152,6 +185,26 @@ class TestOpenAIlikedTranslator(unittest.TestCase):
         self.assertIsNone(translator.envs["OPENAILIKED_API_KEY"])
 
 
+class TestDeepLTranslator(unittest.TestCase):
+    def test_do_translate_batch(self):
+        translator = DeepLTranslator(
+            lang_in="en",
+            lang_out="zh",
+            model=None,
+            envs={"DEEPL_AUTH_KEY": "test_auth_key"},
+        )
+        with mock.patch.object(translator, "client") as mock_client:
+            mock_client.translate_text.return_value = [
+                mock.Mock(text="你好"),
+                mock.Mock(text="世界"),
+            ]
+            translated_result = translator.do_translate_batch(["Hello", "World"])
+            mock_client.translate_text.assert_called_once_with(
+                ["Hello", "World"], target_lang="zh-Hans", source_lang="en"
+            )
+            self.assertEqual(["你好", "世界"], translated_result)
+
+
 class TestOllamaTranslator(unittest.TestCase):
     def test_do_translate(self):
         translator = OllamaTranslator(lang_in="en", lang_out="zh", model="test:3b")